@@ -1,33 +1,26 @@
 #!/usr/bin/env python3
-import base64
-from PIL import Image
-import io
+import os
+import sys
 
 # The base64 string from the browser
 base64_string = "iVBORw0KGgoAAAANSUhEUgAAAgAAAAIACAIAAAB7GkOtAAADEUlEQVR42u3BgQAAAADDoPlTX+EAVQEAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAMBvArQAAf/YBFAAAAAASUVORK5CYII="
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'services'))
+from image_diagnostics import decode_base64, diagnose_image, format_report
+
 try:
-    # Decode base64
-    image_data = base64.b64decode(base64_string)
-    
-    # Load as PIL image
-    image = Image.open(io.BytesIO(image_data))
+    # Decode base64 and load as PIL image
+    image = decode_base64(base64_string)
     
     print(f"Image size: {image.size}")
     print(f"Image mode: {image.mode}")
     print(f"Image format: {image.format}")
     
-    # Check if image is blank/transparent
-    if image.mode == 'RGBA':
-        # Check alpha channel
-        alpha_values = [pixel[3] for pixel in image.getdata()]
-        print(f"Alpha values (first 10): {alpha_values[:10]}")
-        print(f"All pixels transparent: {all(alpha == 0 for alpha in alpha_values)}")
-    
-    # Get pixel data
-    pixels = list(image.getdata())
-    print(f"First 10 pixels: {pixels[:10]}")
-    print(f"All pixels same: {all(pixel == pixels[0] for pixel in pixels)}")
+    # Vectorized blank/black/uniform/transparent checks and channel stats
+    diagnostics = diagnose_image(image)
+    print(format_report("debug image", diagnostics))
+    print(f"All pixels transparent: {diagnostics.is_transparent}")
+    print(f"All pixels same: {diagnostics.is_uniform}")
     
     # Save for inspection
     image.save("debug_image.png")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Jarvis 2.0 - Image diagnostics
+Vectorized blank/black/uniform/NaN/low-variance checks, per-channel stats and a
+perceptual hash for generated images. Used inline by the SD servers and as a CLI
+for auditing generated output offline.
+
+Usage:
+    python src/services/image_diagnostics.py outputs/ debug_image.png
+    python src/services/image_diagnostics.py --base64 "data:image/png;base64,..."
+    python src/services/image_diagnostics.py --json --workers 8 outputs/ > report.jsonl
+"""
+
+import os
+import sys
+import io
+import json
+import base64
+import argparse
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError as e:
+    print(f"Error: Missing required dependencies. Please install: {e}")
+    print("Run: pip install numpy pillow")
+    sys.exit(1)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif')
+
+# Modes with a real alpha band (LAB's "A" band is colour, not alpha)
+ALPHA_MODES = ('LA', 'La', 'PA', 'RGBa')
+
+# Standard deviation (0-255 scale) below which an image is reported as low variance
+LOW_VARIANCE_THRESHOLD = 1.0
+
+HASH_SIZE = 8
+_HASH_SAMPLE = HASH_SIZE * 4
+_HASH_TOLERANCE = 1e-6
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so a 2D DCT is two matrix products"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+_DCT = _dct_matrix(_HASH_SAMPLE)
+
+
+@dataclass
+class ImageDiagnostics:
+    """Diagnostics for a single image"""
+    width: int = 0
+    height: int = 0
+    channels: int = 0
+    mode: Optional[str] = None
+    is_empty: bool = False
+    is_blank: bool = False
+    is_black: bool = False
+    is_uniform: bool = False
+    is_transparent: bool = False
+    has_nan: bool = False
+    low_variance: bool = False
+    std: float = 0.0
+    channel_mean: List[float] = field(default_factory=list)
+    channel_std: List[float] = field(default_factory=list)
+    channel_min: List[float] = field(default_factory=list)
+    channel_max: List[float] = field(default_factory=list)
+    phash: Optional[str] = None
+
+    @property
+    def flags(self) -> List[str]:
+        """Names of the problems detected"""
+        checks = {
+            'empty': self.is_empty,
+            'blank': self.is_blank,
+            'black': self.is_black,
+            'uniform': self.is_uniform,
+            'transparent': self.is_transparent,
+            'nan': self.has_nan,
+            'low_variance': self.low_variance,
+        }
+        return [name for name, failed in checks.items() if failed]
+
+    @property
+    def ok(self) -> bool:
+        """True when the image has usable content"""
+        return not (self.is_empty or self.is_blank or self.has_nan or self.low_variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result['ok'] = self.ok
+        result['flags'] = self.flags
+        return result
+
+
+def perceptual_hash(image: Image.Image) -> str:
+    """DCT-based perceptual hash (pHash) as a 16-character hex string"""
+    small = image.convert('L').resize((_HASH_SAMPLE, _HASH_SAMPLE), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.float64)
+    # Uniform images hash identically whatever their grey level
+    if pixels.min() == pixels.max():
+        return '0' * (HASH_SIZE * HASH_SIZE // 4)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    # Floating-point residue must not decide bits
+    low[np.abs(low) < _HASH_TOLERANCE] = 0.0
+    # Median excludes the DC term, which only tracks overall brightness
+    bits = low > np.median(low[1:])
+    return f"{int(np.packbits(bits).view('>u8')[0]):016x}"
+
+
+def _uint8_stats(pixels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Per-channel min/max/mean/std from one histogram pass per channel"""
+    levels = np.arange(256, dtype=np.float64)
+    hist = np.stack([np.bincount(pixels[:, c], minlength=256) for c in range(pixels.shape[1])])
+    present = hist > 0
+    channel_min = present.argmax(axis=1)
+    channel_max = 255 - present[:, ::-1].argmax(axis=1)
+    count = pixels.shape[0]
+    channel_mean = hist @ levels / count
+    channel_var = hist @ (levels ** 2) / count - channel_mean ** 2
+    return channel_min, channel_max, channel_mean, np.sqrt(np.maximum(channel_var, 0.0))
+
+
+def diagnose_array(img_array: np.ndarray,
+                   low_variance_threshold: float = LOW_VARIANCE_THRESHOLD) -> ImageDiagnostics:
+    """Diagnose an HxW or HxWxC pixel array"""
+    if img_array.ndim not in (2, 3):
+        raise ValueError(f"Expected an HxW or HxWxC image array, got shape {img_array.shape}")
+    if img_array.ndim == 2:
+        img_array = img_array[:, :, None]
+    height, width, channels = img_array.shape
+    diag = ImageDiagnostics(width=width, height=height, channels=channels)
+
+    if img_array.size == 0:
+        diag.is_empty = True
+        diag.is_blank = True
+        return diag
+
+    pixels = img_array.reshape(-1, channels)
+    if np.issubdtype(pixels.dtype, np.floating):
+        finite = np.isfinite(pixels)
+        diag.has_nan = not bool(finite.all())
+        if diag.has_nan:
+            pixels = np.where(finite, pixels, 0)
+
+    if pixels.dtype == np.uint8:
+        channel_min, channel_max, channel_mean, channel_std = _uint8_stats(pixels)
+    else:
+        channel_min = pixels.min(axis=0)
+        channel_max = pixels.max(axis=0)
+        channel_mean = pixels.mean(axis=0, dtype=np.float64)
+        channel_std = pixels.std(axis=0, dtype=np.float64)
+
+    # Alpha (if present) is excluded from colour checks
+    color = slice(0, 3) if channels == 4 else slice(None)
+    diag.is_transparent = bool(channels == 4 and channel_max[3] == 0)
+    diag.is_black = bool(np.all(channel_max[color] == 0))
+    diag.is_uniform = bool(np.all(channel_min == channel_max))
+    diag.is_blank = diag.is_uniform or diag.is_transparent
+
+    # Overall std from per-channel moments, avoiding another pass over the pixels
+    overall_mean = channel_mean.mean()
+    diag.std = float(np.sqrt(np.mean(channel_std ** 2 + (channel_mean - overall_mean) ** 2)))
+    diag.low_variance = diag.std < low_variance_threshold
+
+    diag.channel_min = channel_min.astype(np.float64).tolist()
+    diag.channel_max = channel_max.astype(np.float64).tolist()
+    diag.channel_mean = channel_mean.tolist()
+    diag.channel_std = channel_std.tolist()
+    return diag
+
+
+def diagnose_image(image: Image.Image, with_hash: bool = True,
+                   low_variance_threshold: float = LOW_VARIANCE_THRESHOLD) -> ImageDiagnostics:
+    """Diagnose a PIL image"""
+    if image.mode.startswith('I;16'):
+        # Converting to RGB would clamp 16-bit values to 255
+        image = image.convert('I')
+    elif image.mode not in ('L', 'RGB', 'RGBA', 'F', 'I'):
+        has_alpha = image.mode in ALPHA_MODES or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    diag = diagnose_array(np.asarray(image), low_variance_threshold)
+    diag.mode = image.mode
+    if with_hash and not diag.is_empty:
+        diag.phash = perceptual_hash(image)
+    return diag
+
+
+def decode_base64(data: str) -> Image.Image:
+    """Decode a base64 payload, with or without a data: URL prefix"""
+    if data.startswith('data:'):
+        data = data.split(',', 1)[1]
+    image = Image.open(io.BytesIO(base64.b64decode(data)))
+    image.load()
+    return image
+
+
+def diagnose_base64(data: str, with_hash: bool = True) -> ImageDiagnostics:
+    """Diagnose a base64-encoded image"""
+    return diagnose_image(decode_base64(data), with_hash)
+
+
+def diagnose_file(path: str, with_hash: bool = True) -> ImageDiagnostics:
+    """Diagnose an image file"""
+    with Image.open(path) as image:
+        image.load()
+        return diagnose_image(image, with_hash)
+
+
+def iter_image_paths(paths: Iterable[str]) -> Iterator[str]:
+    """Expand files and directories (recursively) into image paths"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def scan(paths: Iterable[str], workers: int = 4,
+         with_hash: bool = True) -> Iterator[Tuple[str, Optional[ImageDiagnostics], Optional[str]]]:
+    """Diagnose many images in parallel, yielding (path, diagnostics, error)"""
+    def run(path):
+        try:
+            return path, diagnose_file(path, with_hash), None
+        except Exception as e:
+            return path, None, str(e)
+
+    # PIL releases the GIL while decoding, so threads scale across cores
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        yield from pool.map(run, iter_image_paths(paths))
+
+
+def format_report(name: str, diag: ImageDiagnostics) -> str:
+    """Human-readable one-line summary"""
+    status = 'OK' if diag.ok else ','.join(diag.flags).upper()
+    mean = '/'.join(f"{v:.1f}" for v in diag.channel_mean)
+    return (f"{name}: {status} {diag.width}x{diag.height} {diag.mode or ''} "
+            f"std={diag.std:.2f} mean={mean} phash={diag.phash}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Diagnose generated images')
+    parser.add_argument('paths', nargs='*', help='Image files or directories to scan')
+    parser.add_argument('--base64', action='append', default=[], help='Base64 image payload (repeatable)')
+    parser.add_argument('--stdin', action='store_true', help='Read base64 payloads from stdin, one per line')
+    parser.add_argument('--json', action='store_true', help='Emit one JSON object per image')
+    parser.add_argument('--no-hash', action='store_true', help='Skip the perceptual hash')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='Parallel decode workers')
+    args = parser.parse_args(argv)
+
+    payloads = list(args.base64)
+    if args.stdin:
+        payloads.extend(line.strip() for line in sys.stdin if line.strip())
+    if not args.paths and not payloads:
+        parser.error('no images given')
+
+    def results():
+        for index, payload in enumerate(payloads):
+            name = f"<base64:{index}>"
+            try:
+                yield name, diagnose_base64(payload, not args.no_hash), None
+            except Exception as e:
+                yield name, None, str(e)
+        yield from scan(args.paths, args.workers, not args.no_hash)
+
+    failures = 0
+    for name, diag, error in results():
+        if diag is None or not diag.ok:
+            failures += 1
+        if args.json:
+            record = {'source': name, 'error': error} if error else {'source': name, **diag.to_dict()}
+            print(json.dumps(record))
+        else:
+            print(f"{name}: ERROR {error}" if error else format_report(name, diag))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
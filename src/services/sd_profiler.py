@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Jarvis 2.0 - Opt-in generation profiler
+Wraps a single pipeline call in torch.profiler and writes a Chrome trace plus a
+top-operators summary, so slow generations can be inspected in chrome://tracing
+or Perfetto. Nothing is imported or patched unless profiling is requested.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-SD-Profile'
+
+# Pipeline components wrapped with a record_function label while profiling.
+# (attribute on the pipeline, method on that attribute, stage label)
+PIPELINE_STAGES = [
+    ('text_encoder', 'forward', 'sd::text_encode'),
+    ('unet', 'forward', 'sd::unet_step'),
+    ('vae', 'decode', 'sd::vae_decode'),
+]
+
+
+def _truthy(value) -> bool:
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class GenerationProfiler:
+    """Per-request / windowed profiler for Stable Diffusion generations"""
+
+    def __init__(self, output_dir: Optional[str] = None, keep: Optional[int] = None):
+        self.output_dir = output_dir or os.environ.get('SD_PROFILE_DIR', 'profiles')
+        self.keep = keep if keep is not None else int(os.environ.get('SD_PROFILE_KEEP', 20))
+        self.row_limit = int(os.environ.get('SD_PROFILE_ROWS', 25))
+        # torch.profiler records process-wide, so a trace must not overlap
+        # with any other generation on the shared pipeline
+        self._state = threading.Condition()
+        self._active = 0
+        self._profiling = False
+        self._window_remaining = 0
+        self._window_deadline = 0.0
+        self._window_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Arming
+    # ------------------------------------------------------------------
+
+    def arm_window(self, requests: int = 1, seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Profile the next `requests` generations, optionally within `seconds`"""
+        remaining = max(0, int(requests))
+        deadline = 0.0
+        if seconds is not None:
+            seconds = float(seconds)
+            if seconds < 0:
+                raise ValueError("seconds must not be negative")
+            deadline = time.time() + seconds if seconds else 0.0
+
+        with self._window_lock:
+            self._window_remaining = remaining
+            self._window_deadline = deadline
+            logger.info(f"Profiling window armed for {self._window_remaining} request(s)")
+            return self.window_status()
+
+    def window_status(self) -> Dict[str, Any]:
+        """Describe the currently armed profiling window"""
+        remaining = self._window_remaining
+        if self._window_deadline and time.time() > self._window_deadline:
+            remaining = 0
+        return {
+            'remaining_requests': remaining,
+            'expires_at': self._window_deadline or None,
+            'output_dir': os.path.abspath(self.output_dir),
+            'keep': self.keep
+        }
+
+    def should_profile(self, data: Optional[Dict[str, Any]] = None, headers=None) -> bool:
+        """Check the request flag/header, then consume one slot of an armed window"""
+        if data and _truthy(data.get('profile', False)):
+            return True
+        if headers is not None and _truthy(headers.get(PROFILE_HEADER, '')):
+            return True
+        if not self._window_remaining:
+            return False
+        with self._window_lock:
+            if self._window_deadline and time.time() > self._window_deadline:
+                self._window_remaining = 0
+            if self._window_remaining <= 0:
+                return False
+            self._window_remaining -= 1
+            return True
+
+    # ------------------------------------------------------------------
+    # Profiling
+    # ------------------------------------------------------------------
+
+    def session(self, enabled: bool, pipe=None, label: str = 'generate'):
+        """Wrap one generation; profiles it when enabled, otherwise only tracks it"""
+        if not enabled:
+            return self._generation(None)
+        return self._profile(pipe, label)
+
+    @staticmethod
+    def stage(session, name: str):
+        """Label a stage inside a session; no-op when the session is disabled"""
+        if session is None or 'skipped' in session:
+            return nullcontext()
+        import torch
+        return torch.profiler.record_function(name)
+
+    @contextmanager
+    def _generation(self, result):
+        """Track an unprofiled generation, waiting out any trace in progress"""
+        with self._state:
+            while self._profiling:
+                self._state.wait()
+            self._active += 1
+        try:
+            yield result
+        finally:
+            with self._state:
+                self._active -= 1
+                self._state.notify_all()
+
+    @contextmanager
+    def _profile(self, pipe, label: str):
+        with self._state:
+            if self._profiling:
+                reason = 'busy'
+            elif self._active:
+                reason = 'concurrent'
+            else:
+                reason = None
+                self._profiling = True
+
+        if reason:
+            logger.warning(f"Skipping profile ({reason}): another generation is running")
+            # Reported back to the client, since an armed window slot was used
+            with self._generation({'skipped': reason}) as result:
+                yield result
+            return
+
+        try:
+            import torch
+            from torch.profiler import profile, ProfilerActivity
+
+            activities = [ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(ProfilerActivity.CUDA)
+
+            result: Dict[str, Any] = {}
+            with self._label_stages(pipe):
+                with profile(activities=activities, record_shapes=True, profile_memory=True) as prof:
+                    yield result
+            try:
+                result.update(self._write(prof, label, activities))
+            except Exception as e:
+                logger.error(f"Failed to write profile: {e}")
+                result['error'] = str(e)
+        finally:
+            with self._state:
+                self._profiling = False
+                self._state.notify_all()
+
+    @contextmanager
+    def _label_stages(self, pipe):
+        """Temporarily wrap pipeline components in record_function labels"""
+        import torch
+
+        patched = []
+        for attr, method, name in PIPELINE_STAGES:
+            module = getattr(pipe, attr, None) if pipe is not None else None
+            original = getattr(module, method, None) if module is not None else None
+            if original is None:
+                continue
+
+            def wrapped(*args, _original=original, _name=name, **kwargs):
+                with torch.profiler.record_function(_name):
+                    return _original(*args, **kwargs)
+
+            # accelerate offload hooks install forward on the instance itself
+            had_instance_attr = method in vars(module)
+            setattr(module, method, wrapped)
+            patched.append((module, method, original if had_instance_attr else None))
+        try:
+            yield
+        finally:
+            for module, method, original in patched:
+                if original is not None:
+                    setattr(module, method, original)
+                else:
+                    delattr(module, method)
+
+    def _write(self, prof, label: str, activities) -> Dict[str, Any]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        now = time.time()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        base = os.path.join(self.output_dir, f"{stamp}-{label}")
+        trace_path = f"{base}.trace.json"
+        summary_path = f"{base}.summary.txt"
+
+        prof.export_chrome_trace(trace_path)
+
+        from torch.profiler import ProfilerActivity
+        sort_by = 'cuda_time_total' if ProfilerActivity.CUDA in activities else 'cpu_time_total'
+        table = prof.key_averages().table(sort_by=sort_by, row_limit=self.row_limit)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(table)
+
+        logger.info(f"Profile written: {trace_path}")
+        self._enforce_retention()
+        return {'trace': os.path.abspath(trace_path), 'summary': os.path.abspath(summary_path)}
+
+    def _enforce_retention(self):
+        """Keep only the newest `keep` profiles"""
+        if self.keep <= 0:
+            return
+        try:
+            traces = sorted(
+                (f for f in os.listdir(self.output_dir) if f.endswith('.trace.json')),
+                reverse=True
+            )
+        except OSError:
+            return
+        for name in traces[self.keep:]:
+            base = name[:-len('.trace.json')]
+            for suffix in ('.trace.json', '.summary.txt'):
+                try:
+                    os.remove(os.path.join(self.output_dir, base + suffix))
+                except OSError:
+                    pass
+
+    def list_profiles(self):
+        """List stored profiles, newest first"""
+        if not os.path.isdir(self.output_dir):
+            return []
+        return sorted(
+            (f[:-len('.trace.json')] for f in os.listdir(self.output_dir) if f.endswith('.trace.json')),
+            reverse=True
+        )
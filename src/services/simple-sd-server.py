@@ -25,12 +25,18 @@ except ImportError as e:
     logger.error(f"Missing dependencies: {e}")
     sys.exit(1)
 
+from sd_profiler import GenerationProfiler
+from image_diagnostics import diagnose_array
+
 app = Flask(__name__)
 CORS(app)
 
 # Global pipeline - load once, use many times
 pipe = None
 
+# Opt-in profiler (flag/header on /generate, or a window armed via /profile)
+profiler = GenerationProfiler()
+
 # Smart device selection with VRAM check
 def get_optimal_device():
     if not torch.cuda.is_available():
@@ -168,6 +174,25 @@ def warmup():
         logger.error(f"❌ Model warmup failed: {e}")
         return jsonify({"status": "warmup_failed", "error": str(e)}), 500
 
+@app.route('/profile', methods=['GET', 'POST'])
+def profile_window():
+    """Arm a profiling window for upcoming generations, or list stored profiles"""
+    if request.method == 'GET':
+        return jsonify({
+            'window': profiler.window_status(),
+            'profiles': profiler.list_profiles()
+        })
+
+    data = request.get_json(silent=True) or {}
+    try:
+        window = profiler.arm_window(
+            requests=data.get('requests', 1),
+            seconds=data.get('seconds')
+        )
+        return jsonify({'success': True, 'window': window})
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/generate', methods=['POST'])
 def generate():
     """Generate image endpoint"""
@@ -184,6 +209,7 @@ def generate():
         steps = data.get('num_inference_steps', 12)  # Balanced speed/quality with LMS scheduler
         guidance = data.get('guidance_scale', 7.5)
         seed = data.get('seed')
+        profile_enabled = profiler.should_profile(data, request.headers)
         
         logger.info(f"Generating: '{prompt[:50]}...' ({width}x{height}, {steps} steps)")
         
@@ -193,46 +219,47 @@ def generate():
             generator = torch.Generator(device=device).manual_seed(seed)
         
         # Generate image with optimizations
-        with torch.no_grad():
-            # Enable autocast for mixed precision (faster on modern GPUs)
-            with torch.autocast(device_type='cuda' if device == 'cuda' else 'cpu', enabled=device == 'cuda'):
+        with profiler.session(profile_enabled, pipe) as profile:
+            with torch.no_grad():
+                # Enable autocast for mixed precision (faster on modern GPUs)
+                with torch.autocast(device_type='cuda' if device == 'cuda' else 'cpu', enabled=device == 'cuda'):
+                    result = pipe(
+                        prompt=prompt,
+                        negative_prompt=negative_prompt,
+                        width=width,
+                        height=height,
+                        num_inference_steps=steps,
+                        guidance_scale=guidance,
+                        generator=generator
+                    )
+
+            image = result.images[0]
+        
+            # Validate image
+            diagnostics = diagnose_array(np.asarray(image))
+            if diagnostics.is_empty:
+                raise ValueError("Generated image is empty")
+        
+            # Check for completely black image
+            if diagnostics.is_black:
+                logger.warning("Generated image is completely black - regenerating with different seed")
+                # Try again with random seed
+                generator = torch.Generator(device=device).manual_seed(torch.randint(0, 1000000, (1,)).item())
                 result = pipe(
                     prompt=prompt,
-                    negative_prompt=negative_prompt,
                     width=width,
                     height=height,
                     num_inference_steps=steps,
                     guidance_scale=guidance,
                     generator=generator
                 )
+                image = result.images[0]
         
-        image = result.images[0]
-        
-        # Validate image
-        img_array = np.array(image)
-        if img_array.size == 0:
-            raise ValueError("Generated image is empty")
-        
-        # Check for completely black image
-        if np.all(img_array == 0):
-            logger.warning("Generated image is completely black - regenerating with different seed")
-            # Try again with random seed
-            generator = torch.Generator(device=device).manual_seed(torch.randint(0, 1000000, (1,)).item())
-            result = pipe(
-                prompt=prompt,
-                width=width,
-                height=height,
-                num_inference_steps=steps,
-                guidance_scale=guidance,
-                generator=generator
-            )
-            image = result.images[0]
-            img_array = np.array(image)
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        image.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+            # Convert to base64
+            with profiler.stage(profile, 'sd::image_encode'):
+                buffer = io.BytesIO()
+                image.save(buffer, format='PNG')
+                img_str = base64.b64encode(buffer.getvalue()).decode()
         
         # Clear memory after generation (critical for 4GB GPU)
         if device == 'cuda':
@@ -240,13 +267,16 @@ def generate():
 
         logger.info(f"Generated successfully! Image size: {len(img_str)} chars")
 
-        return jsonify({
+        response = {
             'success': True,
             'image': f"data:image/png;base64,{img_str}",
             'prompt': prompt,
             'seed': seed,
             'device': device
-        })
+        }
+        if profile:
+            response['profile'] = profile
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Generation failed: {e}")
@@ -28,6 +28,9 @@ except ImportError as e:
     print("Run: pip install torch torchvision diffusers transformers flask flask-cors pillow accelerate")
     sys.exit(1)
 
+from sd_profiler import GenerationProfiler
+from image_diagnostics import diagnose_array
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='[SD-Server] %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
@@ -42,6 +45,7 @@ class GenerationRequest:
     width: int = 512
     height: int = 512
     seed: Optional[int] = None
+    profile: bool = False
 
 class StableDiffusionService:
     """Stable Diffusion service with request queuing and model management"""
@@ -54,6 +58,7 @@ class StableDiffusionService:
         self.is_loaded = False
         self.generation_queue = queue.Queue()
         self.current_request = None
+        self.profiler = GenerationProfiler()
         
         logger.info(f"Initializing Stable Diffusion service on device: {self.device}")
         
@@ -147,8 +152,8 @@ class StableDiffusionService:
             if req.seed is not None:
                 generator = torch.Generator(device=self.device).manual_seed(req.seed)
             
-            # Generate image
-            with torch.no_grad():
+            # Generate image (profiled only when requested)
+            with self.profiler.session(req.profile, self.pipe) as profile, torch.no_grad():
                 result = self.pipe(
                     prompt=req.prompt,
                     negative_prompt=req.negative_prompt,
@@ -169,8 +174,10 @@ class StableDiffusionService:
                 import numpy as np
                 img_array = np.array(image)
 
+                diagnostics = diagnose_array(img_array)
+
                 # Check for NaN or infinite values
-                if np.any(np.isnan(img_array)) or np.any(np.isinf(img_array)):
+                if diagnostics.has_nan:
                     logger.warning("Image contains invalid values (NaN/inf), fixing...")
                     # Replace invalid values with 0
                     img_array = np.nan_to_num(img_array, nan=0.0, posinf=255.0, neginf=0.0)
@@ -179,31 +186,35 @@ class StableDiffusionService:
                     # Convert back to PIL Image
                     from PIL import Image as PILImage
                     image = PILImage.fromarray(img_array)
+                    diagnostics = diagnose_array(img_array)
                     logger.info("Fixed invalid image values")
 
                 # Verify image has valid content
-                img_array = np.array(image)
-                if np.all(img_array == 0):
+                if diagnostics.is_black:
                     logger.warning("Generated image is completely black")
-                elif np.std(img_array) < 1.0:
+                elif diagnostics.low_variance:
                     logger.warning("Generated image has very low variance (might be blank)")
                 else:
-                    logger.info(f"Generated image looks valid (std: {np.std(img_array):.2f})")
+                    logger.info(f"Generated image looks valid (std: {diagnostics.std:.2f})")
 
-            # Convert to base64
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG', optimize=True)
-            img_str = base64.b64encode(buffer.getvalue()).decode()
+                # Convert to base64
+                with self.profiler.stage(profile, 'sd::image_encode'):
+                    buffer = io.BytesIO()
+                    image.save(buffer, format='PNG', optimize=True)
+                    img_str = base64.b64encode(buffer.getvalue()).decode()
             
             logger.info("Image generated successfully")
             
-            return {
+            response = {
                 'success': True,
                 'image': f"data:image/png;base64,{img_str}",
                 'prompt': req.prompt,
                 'seed': req.seed,
                 'device': self.device
             }
+            if profile:
+                response['profile'] = profile
+            return response
             
         except Exception as e:
             logger.error(f"Generation failed: {e}")
@@ -246,7 +257,8 @@ def generate_image():
             guidance_scale=max(1.0, min(data.get('guidance_scale', 7.5), 20.0)),  # Limit guidance
             width=min(data.get('width', 512), 1024),  # Limit resolution
             height=min(data.get('height', 512), 1024),
-            seed=data.get('seed')
+            seed=data.get('seed'),
+            profile=sd_service.profiler.should_profile(data, request.headers)
         )
         
         # Generate image
@@ -261,6 +273,25 @@ def generate_image():
         logger.error(f"Request failed: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/profile', methods=['GET', 'POST'])
+def profile_window():
+    """Arm a profiling window for upcoming generations, or list stored profiles"""
+    if request.method == 'GET':
+        return jsonify({
+            'window': sd_service.profiler.window_status(),
+            'profiles': sd_service.profiler.list_profiles()
+        })
+
+    data = request.get_json(silent=True) or {}
+    try:
+        window = sd_service.profiler.arm_window(
+            requests=data.get('requests', 1),
+            seconds=data.get('seconds')
+        )
+        return jsonify({'success': True, 'window': window})
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/models', methods=['GET'])
 def list_models():
     """List available models"""
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for image_diagnostics
+Run: python -m pytest src/services/test_image_diagnostics.py
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_diagnostics import diagnose_array, diagnose_image, perceptual_hash
+
+
+def test_uniform_images_hash_the_same_at_any_grey_level():
+    hashes = {perceptual_hash(Image.new('L', (64, 64), v)) for v in (0, 7, 100, 128, 255)}
+    assert hashes == {'0' * 16}
+
+
+def test_uniform_rgb_image_is_blank():
+    diag = diagnose_image(Image.new('RGB', (32, 32), (40, 40, 40)))
+    assert diag.is_blank and diag.is_uniform and not diag.is_black
+    assert diag.phash == '0' * 16
+
+
+def test_uint8_stats_match_numpy():
+    pixels = np.random.default_rng(0).integers(0, 256, (64, 48, 3), dtype=np.uint8)
+    diag = diagnose_array(pixels)
+    assert np.allclose(diag.channel_mean, pixels.reshape(-1, 3).mean(axis=0))
+    assert np.allclose(diag.channel_std, pixels.reshape(-1, 3).std(axis=0))
+    assert np.isclose(diag.std, pixels.std())
+    assert diag.ok
+
+
+def test_nan_pixels_are_flagged():
+    pixels = np.ones((8, 8, 3), dtype=np.float32)
+    pixels[0, 0, 0] = np.nan
+    assert diagnose_array(pixels).has_nan
+
+
+@pytest.mark.parametrize('shape', [(16,), (2, 8, 8, 3)])
+def test_rejects_non_image_shapes(shape):
+    with pytest.raises(ValueError, match='shape'):
+        diagnose_array(np.zeros(shape, dtype=np.uint8))
+
+
+def test_16bit_gradient_is_not_clamped():
+    gradient = np.linspace(1000, 60000, 64 * 64).reshape(64, 64).astype(np.uint16)
+    image = Image.fromarray(gradient)
+    assert image.mode.startswith('I;16')
+    diag = diagnose_image(image)
+    assert diag.flags == []
+    assert diag.channel_min == [1000.0] and diag.channel_max == [60000.0]
+
+
+def test_lab_image_is_not_treated_as_transparent():
+    diag = diagnose_image(Image.new('LAB', (16, 16), (50, 10, 20)))
+    assert diag.channels == 3 and not diag.is_transparent
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests for sd_profiler
+torch.profiler is replaced with a stub, so these run without torch or a GPU.
+Run: python -m pytest src/services/test_sd_profiler.py
+"""
+
+import os
+import sys
+import types
+import threading
+from contextlib import nullcontext
+
+import pytest
+
+from sd_profiler import GenerationProfiler
+
+
+class FakeProfile:
+    """Stand-in for torch.profiler.profile"""
+
+    fail_export = False
+
+    def __init__(self, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def export_chrome_trace(self, path):
+        if FakeProfile.fail_export:
+            raise OSError('disk full')
+        with open(path, 'w') as f:
+            f.write('{}')
+
+    def key_averages(self):
+        return types.SimpleNamespace(table=lambda **kwargs: 'top operators')
+
+
+@pytest.fixture
+def fake_torch(monkeypatch):
+    profiler = types.ModuleType('torch.profiler')
+    profiler.profile = FakeProfile
+    profiler.record_function = lambda name: nullcontext()
+    profiler.ProfilerActivity = types.SimpleNamespace(CPU='cpu', CUDA='cuda')
+    torch = types.ModuleType('torch')
+    torch.profiler = profiler
+    torch.cuda = types.SimpleNamespace(is_available=lambda: False)
+    monkeypatch.setitem(sys.modules, 'torch', torch)
+    monkeypatch.setitem(sys.modules, 'torch.profiler', profiler)
+    monkeypatch.setattr(FakeProfile, 'fail_export', False)
+    return torch
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return GenerationProfiler(output_dir=str(tmp_path), keep=2)
+
+
+def test_arm_window_consumes_one_slot_per_request(profiler):
+    profiler.arm_window(requests=2)
+    assert profiler.should_profile({}, {})
+    assert profiler.should_profile({}, {})
+    assert not profiler.should_profile({}, {})
+
+
+def test_request_flag_does_not_consume_window(profiler):
+    profiler.arm_window(requests=1)
+    assert profiler.should_profile({'profile': True}, {})
+    assert profiler.should_profile({}, {'X-SD-Profile': '1'})
+    assert profiler.window_status()['remaining_requests'] == 1
+
+
+@pytest.mark.parametrize('seconds', ['abc', -1, [1]])
+def test_invalid_window_leaves_state_untouched(profiler, seconds):
+    with pytest.raises((TypeError, ValueError)):
+        profiler.arm_window(requests=3, seconds=seconds)
+    assert profiler.window_status()['remaining_requests'] == 0
+    assert not profiler.should_profile({}, {})
+
+
+def test_expired_window_stops_profiling(profiler, monkeypatch):
+    profiler.arm_window(requests=3, seconds=10)
+    deadline = profiler.window_status()['expires_at']
+    monkeypatch.setattr('sd_profiler.time.time', lambda: deadline + 1)
+    assert not profiler.should_profile({}, {})
+
+
+def test_retention_keeps_newest_profiles(profiler, tmp_path):
+    for stamp in ('20260101-000000-000', '20260101-000001-000', '20260101-000002-000'):
+        for suffix in ('.trace.json', '.summary.txt'):
+            (tmp_path / f"{stamp}-generate{suffix}").write_text('{}')
+    profiler._enforce_retention()
+    assert profiler.list_profiles() == ['20260101-000002-000-generate', '20260101-000001-000-generate']
+    assert len(os.listdir(tmp_path)) == 4
+
+
+def test_session_writes_trace_and_summary(profiler, fake_torch):
+    with profiler.session(True) as result:
+        pass
+    assert os.path.exists(result['trace'])
+    assert open(result['summary']).read() == 'top operators'
+
+
+def test_write_failure_is_reported(profiler, fake_torch):
+    FakeProfile.fail_export = True
+    with profiler.session(True) as result:
+        pass
+    assert result == {'error': 'disk full'}
+
+
+def test_profile_skipped_while_another_generation_runs(profiler, fake_torch):
+    with profiler.session(False):
+        with profiler.session(True) as result:
+            pass
+    assert result == {'skipped': 'concurrent'}
+
+
+def test_generation_waits_for_trace_in_progress(profiler, fake_torch):
+    finished = threading.Event()
+
+    def other_generation():
+        with profiler.session(False):
+            finished.set()
+
+    with profiler.session(True):
+        worker = threading.Thread(target=other_generation)
+        worker.start()
+        assert not finished.wait(0.1)
+    assert finished.wait(1)
+    worker.join()
+
+
+class Module:
+    def forward(self, x):
+        return x + 1
+
+
+def test_label_stages_restores_class_method(profiler, fake_torch):
+    pipe = types.SimpleNamespace(unet=Module())
+    with profiler._label_stages(pipe):
+        assert 'forward' in vars(pipe.unet)
+        assert pipe.unet.forward(1) == 2
+    assert 'forward' not in vars(pipe.unet)
+    assert pipe.unet.forward(1) == 2
+
+
+def test_label_stages_restores_instance_forward(profiler, fake_torch):
+    # accelerate offload hooks replace forward on the instance
+    module = Module()
+    hooked = lambda x: x + 10
+    module.forward = hooked
+    pipe = types.SimpleNamespace(text_encoder=module)
+    with profiler._label_stages(pipe):
+        assert module.forward is not hooked
+        assert module.forward(1) == 11
+    assert module.forward is hooked